@@ -12,9 +12,14 @@ sys.path.insert(0, current_dir)
 
 # Now import modules
 try:
-    from camera_module import RealCamera
+    from camera_module import create_camera
     from detection_module import AIDetector
     from control_module import VehicleControl
+    from recorder_module import IncidentRecorder
+    from state_module import SystemState
+    from profiler_module import tracer, register_debug_routes
+    from registry_module import ModelRegistry, register_model_routes
+    from status_module import StatusCache, register_status_route
     print("✅ All modules imported successfully!")
 except ImportError as e:
     print(f"❌ Import error: {e}")
@@ -23,33 +28,36 @@ except ImportError as e:
     sys.exit(1)
 
 
-from flask import Flask, render_template, Response, jsonify, request
+from flask import Flask, render_template, Response, jsonify
 import cv2
-import threading
 import time
 import numpy as np
-from src.camera_module import RealCamera
-from src.detection_module import AIDetector
-from src.control_module import VehicleControl
 
 app = Flask(__name__)
+register_debug_routes(app)  # no-op endpoints unless HELMET_PROFILING=1
 
 # Global system components
-camera = RealCamera()
+camera = create_camera()  # HELMET_CAMERA=synthetic runs without hardware; HELMET_CAPTURE_MODE picks a preset
 detector = AIDetector()
 controller = VehicleControl()
-system_active = False
-detection_thread = None
 
-# Current status
-current_status = {
+# Shared state: system_active + current status, read lock-free from any thread
+state = SystemState({
     'helmet_detected': False,
     'confidence': 0.0,
     'ignition_allowed': False,
     'message': 'System ready. Click START.',
     'timestamp': '',
-    'camera_frames': 0
-}
+    'camera_frames': 0,
+    'loop_ms': 0.0,
+    'loop_interval_ms': 0.0,
+    'frame_id': None
+})
+
+# Saved clips and model swaps change /api/status, so each publishes a new version
+recorder = IncidentRecorder(camera, on_clip=lambda path: state.touch())
+registry = ModelRegistry(detector, on_swap=lambda name: state.touch())
+register_model_routes(app, registry)  # /api/models, only with HELMET_MODEL_ADMIN=1
 
 @app.route('/')
 def index():
@@ -60,8 +68,8 @@ def index():
 def video_feed():
     """Live video stream"""
     def generate():
-        while system_active:
-            frame_bytes = camera.get_frame_for_web()
+        while state.active:
+            frame_bytes = camera.get_frame_for_web(annotate=draw_current_status)
             if frame_bytes:
                 yield (b'--frame\r\n'
                        b'Content-Type: image/jpeg\r\n\r\n' + 
@@ -80,43 +88,50 @@ def video_feed():
     
     return Response(generate(), mimetype='multipart/x-mixed-replace; boundary=frame')
 
-@app.route('/api/status')
-def get_status():
-    """Get current system status"""
+def build_status(snapshot):
+    """Full status for one state version (cached by status_cache).
+    
+    Anything read here that changes outside the detection loop must call
+    state.touch(), or pollers keep getting the cached body for the old version.
+    """
     camera_status = camera.get_status()
     detector_status = detector.get_status()
     control_status = controller.get_status()
     
-    status = {
-        'system_active': system_active,
+    return {
+        'version': snapshot.version,
+        'system_active': snapshot.active,
         'camera': camera_status,
         'detector': detector_status,
         'controller': control_status,
-        'current': current_status,
+        'recorder': recorder.get_status(),
+        'current': dict(snapshot.current),
         'timestamp': time.strftime("%H:%M:%S")
     }
-    
-    return jsonify(status)
+
+status_cache = StatusCache(build_status)
+
+def mark_status_served(snapshot):
+    """Trace span from publishing a result to the first poll that delivered it"""
+    tracer.mark_served(snapshot.current['frame_id'], 'http_status', snapshot.updated_at)
+
+# GET /api/status: ETag/304, ?wait= long-poll, ?format=msgpack
+register_status_route(app, state, status_cache, on_served=mark_status_served)
 
 @app.route('/api/start', methods=['POST'])
 def start_system():
     """Start the helmet detection system"""
-    global system_active, detection_thread
-    
     try:
-        # Start camera
-        if not camera.start():
+        # Start camera + exactly one detection thread (no-op if already running)
+        started, message = state.start(camera, detection_loop)
+        if not started and not state.active:
             return jsonify({
                 'success': False,
-                'error': 'Failed to start camera'
+                'error': message
             })
         
-        system_active = True
-        
-        # Start detection thread
-        detection_thread = threading.Thread(target=detection_loop)
-        detection_thread.daemon = True
-        detection_thread.start()
+        recorder.start()
+        state.touch()  # recorder status is part of /api/status
         
         return jsonify({
             'success': True,
@@ -135,10 +150,8 @@ def start_system():
 @app.route('/api/stop', methods=['POST'])
 def stop_system():
     """Stop the system"""
-    global system_active
-    
-    system_active = False
-    camera.stop()
+    recorder.stop()
+    state.stop(camera)
     
     return jsonify({
         'success': True,
@@ -149,6 +162,9 @@ def stop_system():
 def toggle_override():
     """Toggle safety override"""
     override, message = controller.toggle_override()
+    if override:
+        recorder.trigger('override')
+    state.touch()  # override is part of /api/status
     return jsonify({
         'override': override,
         'message': message
@@ -165,41 +181,62 @@ def get_logs():
 
 def detection_loop():
     """Main detection loop"""
-    global current_status
-    
-    while system_active:
+    last_cycle = None
+    while state.active:
         try:
+            cycle_start = time.perf_counter()
+            
             # Get frame from camera
-            frame = camera.get_frame()
+            frame, frame_id, grabbed_at, decoded_at = camera.get_frame_info()
             
             if frame is not None:
+                tracer.add_span(frame_id, 'capture', grabbed_at, decoded_at)
+                tracer.add_span(frame_id, 'wait_for_detection', decoded_at, cycle_start)
+                
                 # Run AI detection
-                helmet_detected, confidence, timestamp = detector.detect(frame)
+                with tracer.span(frame_id, 'detect'):
+                    helmet_detected, confidence, timestamp = detector.detect(frame)
+                registry.observe(frame)
                 
                 # Control vehicle
-                ignition_allowed, message = controller.check_and_control(
-                    helmet_detected, confidence
-                )
+                with tracer.span(frame_id, 'check_and_control'):
+                    ignition_allowed, message = controller.check_and_control(
+                        helmet_detected, confidence
+                    )
                 
-                # Update current status
-                current_status = {
-                    'helmet_detected': helmet_detected,
-                    'confidence': float(confidence),
-                    'ignition_allowed': ignition_allowed,
-                    'message': message,
-                    'timestamp': timestamp,
-                    'camera_frames': camera.frame_count
-                }
+                # Save evidence when ignition is blocked (recorder never blocks)
+                if not ignition_allowed:
+                    recorder.trigger('fail')
                 
-                # Draw on frame for display
-                draw_detection_on_frame(frame, helmet_detected, confidence, message)
+                # Publish a new status snapshot
+                with tracer.span(frame_id, 'publish'):
+                    state.update_current(
+                        helmet_detected=helmet_detected,
+                        confidence=float(confidence),
+                        ignition_allowed=ignition_allowed,
+                        message=message,
+                        timestamp=timestamp,
+                        camera_frames=camera.frame_count,
+                        # Time spent in detect+control, and start-to-start period
+                        # (nominally 500ms; anything above that is loop lag)
+                        loop_ms=1000 * (time.perf_counter() - cycle_start),
+                        loop_interval_ms=1000 * (cycle_start - last_cycle) if last_cycle else 0.0,
+                        frame_id=frame_id
+                    )
             
+            last_cycle = cycle_start
             time.sleep(0.5)  # Run detection twice per second
             
         except Exception as e:
             print(f"Detection error: {e}")
             time.sleep(1)
 
+def draw_current_status(frame):
+    """Overlay the latest published detection result on a web frame"""
+    current = state.snapshot().current
+    draw_detection_on_frame(frame, current['helmet_detected'],
+                            current['confidence'], current['message'])
+
 def draw_detection_on_frame(frame, helmet_detected, confidence, message):
     """Draw detection results on frame"""
     if frame is None:
@@ -240,4 +277,4 @@ if __name__ == '__main__':
     print("🌐 Open your browser and go to: http://localhost:5000")
     print("=" * 70)
     
-    app.run(host='0.0.0.0', port=5000, debug=True, use_reloader=False)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=int(os.environ.get('HELMET_PORT', 5000)), debug=True, use_reloader=False, threaded=True)
\ No newline at end of file
@@ -16,9 +16,13 @@ print("=" * 60)
 
 # Import modules
 try:
-    from camera_module import RealCamera
+    from camera_module import create_camera
     from detection_module import AIDetector
     from control_module import VehicleControl
+    from recorder_module import IncidentRecorder
+    from state_module import SystemState
+    from profiler_module import tracer, register_debug_routes
+    from registry_module import ModelRegistry, register_model_routes
     print("✅ Modules imported successfully!")
 except ImportError as e:
     print(f"❌ Import error: {e}")
@@ -36,12 +40,16 @@ import numpy as np
 
 # Create Flask app
 app = Flask(__name__)
+register_debug_routes(app)  # no-op endpoints unless HELMET_PROFILING=1
 
 # Create system components
-camera = RealCamera()
+camera = create_camera()  # HELMET_CAMERA=synthetic runs without hardware; HELMET_CAPTURE_MODE picks a preset
 detector = AIDetector()
 controller = VehicleControl()
-system_active = False
+recorder = IncidentRecorder(camera)
+state = SystemState({})
+registry = ModelRegistry(detector, on_swap=lambda name: state.touch())
+register_model_routes(app, registry)  # /api/models, only with HELMET_MODEL_ADMIN=1
 
 print("\n🎯 System Components:")
 print(f"   Camera: {camera.__class__.__name__}")
@@ -213,10 +221,12 @@ def home():
 
 @app.route('/api/start', methods=['POST'])
 def start_system():
-    global system_active
     try:
-        camera.start()
-        system_active = True
+        # No-op if already running (no second capture thread)
+        started, message = state.start(camera)
+        if not started and not state.active:
+            return jsonify({'success': False, 'error': message})
+        recorder.start()
         return jsonify({
             'success': True,
             'message': 'System started! Camera active.'
@@ -226,17 +236,25 @@ def start_system():
 
 @app.route('/api/detect')
 def detect():
-    if not system_active:
+    if not state.active:
         return jsonify({'success': False, 'error': 'Start system first'})
     
     try:
-        frame = camera.get_frame()
-        is_safe, confidence, timestamp = detector.detect(frame)
-        ignition_allowed, message = controller.check_and_control(is_safe, confidence)
+        request_start = time.perf_counter()
+        frame, frame_id, grabbed_at, decoded_at = camera.get_frame_info()
+        tracer.add_span(frame_id, 'capture', grabbed_at, decoded_at)
+        
+        with tracer.span(frame_id, 'detect'):
+            is_safe, confidence, timestamp = detector.detect(frame)
+        registry.observe(frame)
+        with tracer.span(frame_id, 'check_and_control'):
+            ignition_allowed, message = controller.check_and_control(is_safe, confidence)
+        if not ignition_allowed:
+            recorder.trigger('fail')
         # Pass is_safe to controller (it expects safety status)
         
         
-        return jsonify({
+        response = jsonify({
             'success': True,
             'helmet_detected': is_safe,  # ← Frontend expects this name
             'confidence': confidence,
@@ -245,12 +263,16 @@ def detect():
             'timestamp': timestamp,
             'is_safe': is_safe  # ← Add this for clarity
         })
+        tracer.add_span(frame_id, 'http_detect', request_start, time.perf_counter())
+        return response
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/api/toggle_override', methods=['POST'])
 def toggle_override():
     override, message = controller.toggle_override()
+    if override:
+        recorder.trigger('override')
     return jsonify({'override': override, 'message': message})
 
 # ======== ADD THIS CODE RIGHT HERE ========
@@ -288,4 +310,4 @@ if __name__ == '__main__':
     print("\n📡 Starting web server...")
     print("🌐 Open your browser and go to: http://localhost:5000")
     print("=" * 60)
-    app.run(host='0.0.0.0', port=5000, debug=True, use_reloader=False)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=int(os.environ.get('HELMET_PORT', 5000)), debug=True, use_reloader=False, threaded=True)
\ No newline at end of file
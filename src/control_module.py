@@ -5,17 +5,19 @@ Vehicle Control Module
 
 import csv
 import time
+import threading
 from datetime import datetime
 import os
 
 class VehicleControl:
     """Controls vehicle based on helmet detection"""
     
-    def __init__(self):
+    def __init__(self, log_file='detection_logs.csv'):
         self.ignition = False
         self.safety_override = False
-        self.log_file = 'detection_logs.csv'
-        self.logs = []
+        self.log_file = log_file      # None = don't write a CSV log
+        self.logs = ()    # immutable; replaced as a whole so readers need no lock
+        self.lock = threading.Lock()
         
         # Initialize log file
         self._init_logging()
@@ -24,7 +26,7 @@ class VehicleControl:
     
     def _init_logging(self):
         """Create log file if doesn't exist"""
-        if not os.path.exists(self.log_file):
+        if self.log_file and not os.path.exists(self.log_file):
             with open(self.log_file, 'w', newline='') as f:
                 writer = csv.writer(f)
                 writer.writerow(['timestamp', 'safety_status', 
@@ -32,29 +34,33 @@ class VehicleControl:
     
     def check_and_control(self, is_safe, confidence):
         """Make control decision based on safety status"""
+        # Detection thread and /api/detect requests can both get here
+        with self.lock:
+            return self._check_and_control(is_safe, confidence)
+    
+    def _check_and_control(self, is_safe, confidence):
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
         # Log detection
         self._log_to_csv(timestamp, is_safe, confidence)
         
-        # Add to memory logs
+        # Add to memory logs, keeping only last 20
         log_entry = f"{timestamp} - Safety: {'PASS' if is_safe else 'FAIL'} ({confidence:.0%})"
-        self.logs.append(log_entry)
-        
-        # Keep only last 20 logs in memory
-        if len(self.logs) > 20:
-            self.logs = self.logs[-20:]
+        self.logs = (self.logs + (log_entry,))[-20:]
         
         # Control logic
+        allowed, message = self.decide(is_safe, confidence)
+        self.ignition = allowed
+        return allowed, message
+    
+    def decide(self, is_safe, confidence):
+        """Pure control decision - no logging, no state change (used for re-scoring)"""
         if self.safety_override:
-            self.ignition = True
             return True, "🚨 SAFETY OVERRIDE: Vehicle allowed"
         
         if is_safe and confidence > 0.5:
-            self.ignition = True
             return True, f"✅ ALLOWED: Safety verified ({confidence:.0%} confidence)"
         else:
-            self.ignition = False
             if not is_safe:
                 return False, "❌ BLOCKED: Safety violation - No helmet detected"
             else:
@@ -62,6 +68,8 @@ class VehicleControl:
     
     def _log_to_csv(self, timestamp, is_safe, confidence):
         """Log to CSV file"""
+        if not self.log_file:
+            return
         try:
             with open(self.log_file, 'a', newline='') as f:
                 writer = csv.writer(f)
@@ -77,13 +85,15 @@ class VehicleControl:
     
     def toggle_override(self):
         """Toggle safety override"""
-        self.safety_override = not self.safety_override
-        status = "ON" if self.safety_override else "OFF"
-        return self.safety_override, f"Safety override: {status}"
+        with self.lock:
+            self.safety_override = override = not self.safety_override
+        status = "ON" if override else "OFF"
+        return override, f"Safety override: {status}"
     
     def get_logs(self, count=10):
         """Get recent logs"""
-        return self.logs[-count:] if self.logs else []
+        logs = self.logs
+        return list(logs[-count:]) if logs else []
     
     def get_status(self):
         return {
@@ -2,19 +2,46 @@
 AI Detection Module - Uses YOUR ultralytics YOLO!
 """
 
+import cv2
 import time
+import threading
 import numpy as np
 from ultralytics import YOLO
 
+def to_model_input(frame):
+    """YOLOv8 needs 3-channel input; expand grayscale capture frames"""
+    if frame is not None and frame.ndim == 2:
+        return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+    return frame
+
+def find_person(results):
+    """(person_detected, best person confidence) from YOLO results"""
+    person_detected = False
+    confidence = 0.0
+    
+    for result in results:
+        if result.boxes is not None:
+            for box in result.boxes:
+                cls = int(box.cls[0])
+                conf = float(box.conf[0])
+                
+                # Class 0 = person in COCO dataset
+                if cls == 0 and conf > 0.5:
+                    person_detected = True
+                    confidence = max(confidence, conf)
+    
+    return person_detected, confidence
+
 class AIDetector:
     """Real AI detector using YOLOv8"""
     
-    def __init__(self):
+    def __init__(self, model_path='yolov8n.pt'):
         print("🤖 Loading YOLOv8 AI model...")
+        self.model_name = model_path
         
         try:
             # Load YOLOv8 model (you have this installed!)
-            self.model = YOLO('yolov8n.pt')
+            self.model = YOLO(model_path)
             print("✅ YOLOv8 model loaded successfully!")
             self.model_loaded = True
             
@@ -25,64 +52,107 @@ class AIDetector:
         
         self.detection_count = 0
         self.last_detection = None
+        self.last_inference = None   # latency + raw person result of the last model call
+        # Live dashboard: keep running on simulated verdicts if the model is
+        # missing or fails. Batch users set this False to get an exception instead
+        self.fallback_to_simulation = True
+        # YOLO predictors aren't safe to call from several threads at once
+        self.lock = threading.Lock()
         
     def detect(self, frame):
         """Detect helmet using AI"""
+        with self.lock:
+            return self._detect(frame)
+    
+    def _detect(self, frame):
         self.detection_count += 1
         
         if self.model_loaded and frame is not None:
             try:
                 # REAL AI DETECTION with YOLO!
-                results = self.model(frame, verbose=False)
-                
-                person_detected = False
-                confidence = 0.0
-                
-                for result in results:
-                    if result.boxes is not None:
-                        for box in result.boxes:
-                            cls = int(box.cls[0])
-                            conf = float(box.conf[0])
-                            
-                            # Class 0 = person in COCO dataset
-                            if cls == 0 and conf > 0.5:
-                                person_detected = True
-                                confidence = max(confidence, conf)
-                
-                # For helmet detection demo:
-                # Since YOLOv8n doesn't know "helmet", we simulate it
-                # In real project, you'd train YOLO on helmet dataset
-                
-                if person_detected:
-                    # Simulate: Person with helmet 70% of time
-                    has_helmet = (self.detection_count % 10) < 7
-                    
-                    # ✅ SAFETY LOGIC: Person + Helmet = Safe
-                    is_safe = has_helmet  # True only if BOTH person AND helmet
-                    confidence = 0.8 if has_helmet else 0.4
-                else:
-                    # ❌ NO person = NEVER safe
-                    has_helmet = False
-                    is_safe = False  # No person = unsafe
-                    confidence = 0.3
-                
-                # ✅ Store detection results
-                self.last_detection = {
+                start = time.perf_counter()
+                results = self.model(to_model_input(frame), verbose=False)
+                person_detected, person_conf = find_person(results)
+                self.last_inference = {
+                    # Which call / frame this is, so A/B never pairs a frame
+                    # with an older result (e.g. when this call fell back)
+                    'detection': self.detection_count,
+                    'frame': id(frame),
+                    'model': self.model_name,
+                    'ms': 1000 * (time.perf_counter() - start),
                     'person_detected': person_detected,
-                    'helmet': has_helmet,
-                    'is_safe': is_safe,  # ← Important: track safety status
-                    'confidence': confidence,
-                    'timestamp': time.strftime("%H:%M:%S")
+                    'person_confidence': person_conf
                 }
-                
-                # ✅ Return SAFETY status, not just helmet
-                return is_safe, confidence, time.strftime("%H:%M:%S")
+                return self._interpret(results)
                 
             except Exception as e:
+                if not self.fallback_to_simulation:
+                    raise
                 print(f"⚠️ AI detection error: {e}")
                 # Fall through to simulation
+        elif not self.fallback_to_simulation:
+            raise RuntimeError("No model loaded" if not self.model_loaded else "No frame")
+        
+        return self._simulate()
+    
+    def detect_batch(self, frames):
+        """Detect on a list of frames in one model call (offline scoring).
+        
+        Returns one (is_safe, confidence, timestamp) per frame, same as detect().
+        """
+        with self.lock:
+            if self.model_loaded and frames:
+                try:
+                    batch_results = self.model([to_model_input(f) for f in frames],
+                                               verbose=False)
+                    verdicts = []
+                    for result in batch_results:
+                        self.detection_count += 1
+                        verdicts.append(self._interpret([result]))
+                    return verdicts
+                except Exception as e:
+                    if not self.fallback_to_simulation:
+                        raise
+                    print(f"⚠️ AI batch detection error: {e}")
+                    # Fall back to one frame at a time
+            
+            return [self._detect(frame) for frame in frames]
+    
+    def _interpret(self, results):
+        """Turn YOLO results for one frame into a safety verdict"""
+        person_detected, confidence = find_person(results)
+        
+        # For helmet detection demo:
+        # Since YOLOv8n doesn't know "helmet", we simulate it
+        # In real project, you'd train YOLO on helmet dataset
+        
+        if person_detected:
+            # Simulate: Person with helmet 70% of time
+            has_helmet = (self.detection_count % 10) < 7
+            
+            # ✅ SAFETY LOGIC: Person + Helmet = Safe
+            is_safe = has_helmet  # True only if BOTH person AND helmet
+            confidence = 0.8 if has_helmet else 0.4
+        else:
+            # ❌ NO person = NEVER safe
+            has_helmet = False
+            is_safe = False  # No person = unsafe
+            confidence = 0.3
         
-        # Simulation mode (fallback)
+        # ✅ Store detection results
+        self.last_detection = {
+            'person_detected': person_detected,
+            'helmet': has_helmet,
+            'is_safe': is_safe,  # ← Important: track safety status
+            'confidence': confidence,
+            'timestamp': time.strftime("%H:%M:%S")
+        }
+        
+        # ✅ Return SAFETY status, not just helmet
+        return is_safe, confidence, time.strftime("%H:%M:%S")
+    
+    def _simulate(self):
+        """Simulation mode (fallback)"""
         has_helmet = (self.detection_count % 10) < 7
         confidence = 0.85 if has_helmet else 0.45
         
@@ -92,10 +162,23 @@ class AIDetector:
         
         return is_safe, confidence, time.strftime("%H:%M:%S")
     
+    def swap_model(self, model, model_name):
+        """Atomically replace the model between two frames.
+        
+        Waits for the in-flight detect() to finish (it holds the lock), so no
+        frame is dropped or run half on each model. Returns the swap time in ms.
+        """
+        start = time.perf_counter()
+        with self.lock:
+            self.model = model
+            self.model_name = model_name
+            self.model_loaded = True
+        return 1000 * (time.perf_counter() - start)
+    
     def get_status(self):
         return {
             'model_loaded': self.model_loaded,
             'total_detections': self.detection_count,
-            'model': 'YOLOv8n (ultralytics)',
+            'model': f'{self.model_name} (ultralytics)',
             'last_detection': self.last_detection
         }
\ No newline at end of file
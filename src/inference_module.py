@@ -0,0 +1,303 @@
+"""
+Inference Pool Module - runs AIDetector in K worker processes.
+
+The model is loaded ONCE in the parent. Workers are forked afterwards, so
+they share the model weights copy-on-write instead of each loading its own.
+Linux / CPU only: fork is not available on Windows and CUDA does not
+survive a fork.
+"""
+
+import gc
+import os
+import sys
+import time
+import queue
+import threading
+import collections
+import multiprocessing as mp
+
+class InferenceError(RuntimeError):
+    """A frame could not be scored (detection raised, or its worker died)"""
+
+def _worker_loop(worker_id, detector, in_queue, out_queue):
+    """Worker process: run detection on frames until told to stop"""
+    # The parent's detector lock may have been held by another thread at
+    # fork time; a locked copy would deadlock this process on its first job
+    detector.lock = threading.Lock()
+    # A simulated verdict must come back as an error, not as a real result
+    detector.fallback_to_simulation = False
+    
+    # K processes x N torch threads each would oversubscribe the CPU
+    try:
+        import torch
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+
+    while True:
+        job = in_queue.get()
+        if job is None:
+            break
+        seq, frame = job
+        start = time.perf_counter()
+        error = None
+        try:
+            result = detector.detect(frame)
+        except Exception as e:
+            result = None
+            error = f"worker {worker_id}: {e}"
+        out_queue.put((seq, worker_id, result, error, time.perf_counter() - start))
+
+def _memory_kb(pid):
+    """Rss / Pss of a process in kB (Pss counts shared pages fractionally)"""
+    memory = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                key = line.split(':')[0]
+                if key in ('Rss', 'Pss'):
+                    memory[key.lower() + '_kb'] = int(line.split()[1])
+    except OSError:
+        pass
+    return memory
+
+class InferencePool:
+    """K forked detector processes with least-loaded dispatch and in-order results"""
+
+    def __init__(self, detector, workers=None):
+        self.detector = detector
+        self.num_workers = workers or os.cpu_count() or 1
+        self.workers = []
+        self.in_queues = []
+        self.out_queue = None
+        self.in_flight = []          # outstanding frames per worker
+        self.alive = []              # False once a worker process has died
+        self.assigned = {}           # seq -> worker_id, until its result arrives
+        self.next_worker = 0         # round-robin tie breaker
+        self.next_seq = 0            # sequence number for the next submitted frame
+        self.next_result_seq = 0     # sequence number next_result() returns next
+        self.completed = {}          # seq -> result (or InferenceError), returned in order
+        self.discarded = set()       # seqs nobody will collect; dropped when they arrive
+        self.cond = threading.Condition()
+        self.collector = None
+        self.is_running = False
+        self.frames_done = 0
+        self.busy_time = 0.0
+
+    def start(self):
+        """Fork the workers (model must already be loaded in the parent)"""
+        if self.is_running:
+            return
+        ctx = mp.get_context('fork')
+        self.out_queue = ctx.Queue()
+
+        # Move everything allocated so far into the permanent generation so
+        # the garbage collector doesn't write to (and un-share) those pages
+        gc.collect()
+        gc.freeze()
+
+        # Unbounded input queues: map() already limits frames in flight, and a
+        # bounded put() to a worker that just died would block forever.
+        # Holding the detector lock keeps other threads out of detect() while
+        # the model is copied into each child.
+        with self.detector.lock:
+            for worker_id in range(self.num_workers):
+                in_queue = ctx.Queue()
+                process = ctx.Process(target=_worker_loop,
+                                      args=(worker_id, self.detector, in_queue, self.out_queue))
+                process.daemon = True
+                process.start()
+                self.workers.append(process)
+                self.in_queues.append(in_queue)
+                self.in_flight.append(0)
+                self.alive.append(True)
+
+        gc.unfreeze()
+        self.is_running = True
+
+        self.collector = threading.Thread(target=self._collect_loop)
+        self.collector.daemon = True
+        self.collector.start()
+        print(f"🧠 Inference pool started with {self.num_workers} workers")
+
+    def submit(self, frame):
+        """Send a frame to the least-loaded worker; returns its sequence number"""
+        with self.cond:
+            live = [i for i in range(self.num_workers) if self.alive[i]]
+            if not live:
+                raise InferenceError("All inference workers have died")
+            seq = self.next_seq
+            self.next_seq += 1
+            least = min(self.in_flight[i] for i in live)
+            # Round-robin among the equally least-loaded live workers
+            for offset in range(self.num_workers):
+                worker_id = (self.next_worker + offset) % self.num_workers
+                if self.alive[worker_id] and self.in_flight[worker_id] == least:
+                    break
+            self.next_worker = (worker_id + 1) % self.num_workers
+            self.in_flight[worker_id] += 1
+            self.assigned[seq] = worker_id
+
+        self.in_queues[worker_id].put((seq, frame))
+        return seq
+
+    def _collect_loop(self):
+        """Move worker results into the reorder buffer; fail frames of dead workers"""
+        last_check = time.time()
+        while self.is_running:
+            try:
+                seq, worker_id, result, error, elapsed = self.out_queue.get(timeout=0.5)
+            except queue.Empty:
+                seq = None
+
+            with self.cond:
+                # Ignore results for frames already failed by _check_workers
+                if seq is not None and self.assigned.pop(seq, None) is not None:
+                    self.in_flight[worker_id] -= 1
+                    if seq in self.discarded:
+                        self.discarded.remove(seq)
+                    else:
+                        self.completed[seq] = (InferenceError(f"Frame {seq}: {error}")
+                                               if error else result)
+                    self.frames_done += 1
+                    self.busy_time += elapsed
+                    self.cond.notify_all()
+
+                if time.time() - last_check >= 0.5:
+                    last_check = time.time()
+                    self._check_workers()
+
+    def _check_workers(self):
+        """Mark dead workers (OOM, segfault) and fail their in-flight frames.
+        Called with self.cond held."""
+        if not self.is_running:
+            return
+        for worker_id, process in enumerate(self.workers):
+            if not self.alive[worker_id] or process.is_alive():
+                continue
+            self.alive[worker_id] = False
+            lost = [seq for seq, w in self.assigned.items() if w == worker_id]
+            for seq in lost:
+                del self.assigned[seq]
+                if seq in self.discarded:
+                    self.discarded.remove(seq)
+                    continue
+                self.completed[seq] = InferenceError(
+                    f"Frame {seq}: worker {worker_id} died (exit code {process.exitcode})")
+            self.in_flight[worker_id] = 0
+            print(f"❌ Inference worker {worker_id} died; {len(lost)} frames failed")
+            self.cond.notify_all()
+
+    def next_result(self, timeout=None):
+        """Next result in submission order: (seq, (is_safe, confidence, timestamp)).
+        
+        Raises InferenceError if that frame failed.
+        """
+        return self.result(self.next_result_seq, timeout)
+
+    def result(self, seq, timeout=None):
+        """Result of one submitted frame: (seq, (is_safe, confidence, timestamp)).
+        
+        Raises InferenceError if that frame failed.
+        """
+        with self.cond:
+            if not self.cond.wait_for(lambda: seq in self.completed, timeout=timeout):
+                raise TimeoutError(f"No result for frame {seq}")
+            self.next_result_seq = max(self.next_result_seq, seq + 1)
+            result = self.completed.pop(seq)
+        if isinstance(result, InferenceError):
+            raise result
+        return seq, result
+
+    def discard(self, seqs):
+        """Give up on submitted frames; their results are dropped, never returned"""
+        with self.cond:
+            for seq in seqs:
+                if self.completed.pop(seq, None) is None and seq in self.assigned:
+                    self.discarded.add(seq)
+                self.next_result_seq = max(self.next_result_seq, seq + 1)
+
+    def map(self, frames):
+        """Detect on an iterable of frames, yielding results in input order.
+        
+        Raises InferenceError for a frame that failed (detection error or dead worker).
+        Frames still in flight when that happens, or when the caller stops
+        iterating early, are discarded so a later map() never sees their results.
+        """
+        pending = collections.deque()    # seqs submitted by this call, in order
+        try:
+            for frame in frames:
+                pending.append(self.submit(frame))
+                # Keep every worker busy but don't buffer the whole input
+                if len(pending) >= 2 * self.num_workers:
+                    yield self.result(pending.popleft())[1]
+            while pending:
+                yield self.result(pending.popleft())[1]
+        finally:
+            self.discard(pending)
+
+    def stop(self):
+        """Stop all workers"""
+        # Stop the collector first so exiting workers aren't reported as dead
+        self.is_running = False
+        for in_queue in self.in_queues:
+            in_queue.put(None)
+        for process in self.workers:
+            process.join(timeout=2)
+        if self.collector:
+            self.collector.join(timeout=2)
+        self.workers, self.in_queues, self.in_flight, self.alive = [], [], [], []
+        self.assigned = {}
+        self.completed = {}
+        self.discarded = set()
+        self.next_seq = self.next_result_seq = 0
+        print("🛑 Inference pool stopped")
+
+    def get_status(self):
+        with self.cond:
+            status = {
+                'running': self.is_running,
+                'workers': self.num_workers,
+                'in_flight': list(self.in_flight),
+                'frames_done': self.frames_done,
+                'avg_inference_ms': 1000 * self.busy_time / max(self.frames_done, 1),
+            }
+        status['memory'] = {
+            'parent': _memory_kb(os.getpid()),
+            'workers': [_memory_kb(p.pid) for p in self.workers if p.is_alive()],
+        }
+        return status
+
+# Test function
+def test_pool(workers=4, frames=200):
+    """Compare single-process vs pool throughput and memory"""
+    import numpy as np
+    from detection_module import AIDetector
+
+    print(f"🧪 Testing inference pool ({workers} workers, {frames} frames)...")
+    detector = AIDetector()
+    frame = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
+
+    start = time.time()
+    for _ in range(frames):
+        detector.detect(frame)
+    single_fps = frames / (time.time() - start)
+
+    pool = InferencePool(detector, workers)
+    pool.start()
+    start = time.time()
+    results = list(pool.map(frame for _ in range(frames)))
+    pool_fps = len(results) / (time.time() - start)
+    status = pool.get_status()
+    pool.stop()
+
+    print(f"   single process: {single_fps:.1f} fps")
+    print(f"   pool:           {pool_fps:.1f} fps ({pool_fps / single_fps:.1f}x)")
+    parent = status['memory']['parent']
+    for i, memory in enumerate(status['memory']['workers']):
+        print(f"   worker {i}: rss {memory.get('rss_kb', 0) // 1024} MB, "
+              f"pss {memory.get('pss_kb', 0) // 1024} MB")
+    print(f"   parent:   rss {parent.get('rss_kb', 0) // 1024} MB")
+
+if __name__ == "__main__":
+    test_pool(int(sys.argv[1]) if len(sys.argv) > 1 else 4)
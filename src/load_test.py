@@ -0,0 +1,273 @@
+"""
+Load Test - how many dashboard / stream clients can one box handle?
+
+Opens N MJPEG viewers and M polling clients against a running app and reports
+request latency percentiles, stream fps per viewer and detection-loop lag.
+Uses only the standard library, and with --spawn it starts the app itself on
+the synthetic camera, so it runs fully offline:
+
+    python load_test.py --spawn app.py --viewers 8 --pollers 32 --duration 30
+    python load_test.py --spawn app_fixed.py --pollers 16
+"""
+
+import os
+import sys
+import time
+import json
+import argparse
+import threading
+import subprocess
+import http.client
+from urllib.parse import urlparse
+
+# Endpoints per app: what a viewer streams and what a poller polls
+APP_ENDPOINTS = {
+    'app.py': {'stream': '/video_feed', 'poll': '/api/status'},
+    'app_fixed.py': {'snapshot': '/camera_feed', 'poll': '/api/detect'},
+}
+
+def percentile(values, pct):
+    """pct-th percentile of values (nearest rank)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def summarize(values):
+    return {
+        'count': len(values),
+        'p50': percentile(values, 50),
+        'p90': percentile(values, 90),
+        'p99': percentile(values, 99),
+        'max': max(values) if values else 0.0,
+    }
+
+class LoadTest:
+    """Drives viewer and poller threads against one server"""
+
+    def __init__(self, base_url, endpoints, viewers, pollers, duration, poll_interval):
+        parsed = urlparse(base_url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.endpoints = endpoints
+        self.viewers = viewers
+        self.pollers = pollers
+        self.duration = duration
+        self.poll_interval = poll_interval
+
+        self.lock = threading.Lock()
+        self.latencies = {}        # path -> [ms]
+        self.errors = 0
+        self.stream_fps = []       # one entry per viewer
+        self.loop_intervals = []   # detection loop start-to-start, ms
+        self.loop_times = []       # detection loop busy time, ms
+
+    def _connect(self, timeout=10):
+        return http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+
+    def _request(self, conn, method, path):
+        """One request on a keep-alive connection; returns (ms, body)"""
+        start = time.perf_counter()
+        conn.request(method, path)
+        response = conn.getresponse()
+        body = response.read()
+        elapsed = 1000 * (time.perf_counter() - start)
+        with self.lock:
+            self.latencies.setdefault(path, []).append(elapsed)
+        return elapsed, body
+
+    def _poller(self, path, end_time):
+        conn = self._connect()
+        while time.time() < end_time:
+            try:
+                self._request(conn, 'GET', path)
+            except (OSError, http.client.HTTPException):
+                with self.lock:
+                    self.errors += 1
+                conn.close()
+                conn = self._connect()
+            if self.poll_interval:
+                time.sleep(self.poll_interval)
+        conn.close()
+
+    def _stream_viewer(self, path, end_time):
+        """Read a multipart MJPEG stream and count frames"""
+        frames = 0
+        start = time.time()
+        try:
+            conn = self._connect()
+            conn.request('GET', path)
+            response = conn.getresponse()
+            boundary = b'--frame\r\n'
+            tail = b''
+            while time.time() < end_time:
+                chunk = response.read1(65536)
+                if not chunk:
+                    break
+                data = tail + chunk
+                frames += data.count(boundary)
+                # Keep just enough bytes to complete a boundary split across
+                # chunks, but never a whole one (it would be counted twice)
+                tail = data[-(len(boundary) - 1):]
+            conn.close()
+        except (OSError, http.client.HTTPException):
+            with self.lock:
+                self.errors += 1
+        with self.lock:
+            self.stream_fps.append(frames / max(time.time() - start, 1e-6))
+
+    def _snapshot_viewer(self, path, end_time):
+        """app_fixed.py has no stream; viewers fetch single JPEGs as fast as they can"""
+        frames = 0
+        start = time.time()
+        conn = self._connect()
+        while time.time() < end_time:
+            try:
+                self._request(conn, 'GET', path)
+                frames += 1
+            except (OSError, http.client.HTTPException):
+                with self.lock:
+                    self.errors += 1
+                conn.close()
+                conn = self._connect()
+        conn.close()
+        with self.lock:
+            self.stream_fps.append(frames / max(time.time() - start, 1e-6))
+
+    def _loop_monitor(self, end_time):
+        """Sample the detection loop timings app.py publishes in /api/status"""
+        conn = self._connect()
+        last_seen = None
+        while time.time() < end_time:
+            try:
+                conn.request('GET', '/api/status')
+                status = json.loads(conn.getresponse().read())
+            except (OSError, ValueError, http.client.HTTPException):
+                conn.close()
+                conn = self._connect()
+                status = {}
+            current = status.get('current', {})
+            interval = current.get('loop_interval_ms')
+            # One sample per detection cycle: each cycle publishes a new frame_id
+            if interval and current.get('frame_id') != last_seen:
+                last_seen = current.get('frame_id')
+                self.loop_intervals.append(interval)
+                self.loop_times.append(current.get('loop_ms', 0.0))
+            time.sleep(0.25)
+        conn.close()
+
+    def run(self):
+        # Start the system (camera + detection thread)
+        conn = self._connect()
+        conn.request('POST', '/api/start')
+        print(f"▶ /api/start: {conn.getresponse().read().decode()[:80]}")
+        conn.close()
+        time.sleep(1)
+
+        end_time = time.time() + self.duration
+        threads = []
+        for _ in range(self.viewers):
+            if 'stream' in self.endpoints:
+                args = (self._stream_viewer, self.endpoints['stream'])
+            else:
+                args = (self._snapshot_viewer, self.endpoints['snapshot'])
+            threads.append(threading.Thread(target=args[0], args=(args[1], end_time)))
+        for _ in range(self.pollers):
+            threads.append(threading.Thread(target=self._poller,
+                                            args=(self.endpoints['poll'], end_time)))
+        if self.endpoints['poll'] == '/api/status':
+            threads.append(threading.Thread(target=self._loop_monitor, args=(end_time,)))
+
+        print(f"🔥 {self.viewers} viewers + {self.pollers} pollers for {self.duration}s...")
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=self.duration + 15)
+
+        return self.report()
+
+    def report(self):
+        results = {
+            'latency_ms': {path: summarize(values) for path, values in self.latencies.items()},
+            'stream_fps': summarize(self.stream_fps),
+            'loop_interval_ms': summarize(self.loop_intervals),
+            'loop_ms': summarize(self.loop_times),
+            'errors': self.errors,
+        }
+
+        print("\n📊 RESULTS")
+        for path, stats in results['latency_ms'].items():
+            print(f"   {path:<14} n={stats['count']:<6} p50={stats['p50']:.1f}ms "
+                  f"p90={stats['p90']:.1f}ms p99={stats['p99']:.1f}ms max={stats['max']:.1f}ms")
+        if self.stream_fps:
+            fps = results['stream_fps']
+            print(f"   stream fps/viewer: p50={fps['p50']:.1f} min={min(self.stream_fps):.1f}")
+        if self.loop_intervals:
+            lag = results['loop_interval_ms']
+            print(f"   detection loop period: p50={lag['p50']:.0f}ms p99={lag['p99']:.0f}ms "
+                  f"(nominal 500ms, lag = period - 500)")
+            print(f"   detection loop busy:   p50={results['loop_ms']['p50']:.0f}ms")
+        print(f"   errors: {self.errors}")
+        return results
+
+def spawn_app(script, port):
+    """Start app script on the synthetic camera and wait until it answers"""
+    env = dict(os.environ, HELMET_CAMERA='synthetic', HELMET_PORT=str(port))
+    here = os.path.dirname(os.path.abspath(__file__))
+    process = subprocess.Popen([sys.executable, script], cwd=here, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.time() + 60   # model loading can take a while
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{script} exited with code {process.returncode}")
+        try:
+            conn = http.client.HTTPConnection('localhost', port, timeout=1)
+            conn.request('GET', '/')
+            conn.getresponse().read()
+            conn.close()
+            return process
+        except OSError:
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f"{script} did not start on port {port}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the helmet detection web app")
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--app', choices=sorted(APP_ENDPOINTS), default='app.py',
+                        help="which app's endpoints to hit")
+    parser.add_argument('--spawn', choices=sorted(APP_ENDPOINTS),
+                        help='start this app locally with the synthetic camera')
+    parser.add_argument('--viewers', type=int, default=4, help='MJPEG stream clients')
+    parser.add_argument('--pollers', type=int, default=16, help='polling API clients')
+    parser.add_argument('--duration', type=float, default=20, help='seconds')
+    parser.add_argument('--poll-interval', type=float, default=1.0,
+                        help='seconds between polls per client (0 = as fast as possible)')
+    parser.add_argument('--json', help='also write results to this file')
+    args = parser.parse_args()
+
+    process = None
+    app_name = args.app
+    if args.spawn:
+        app_name = args.spawn
+        port = urlparse(args.url).port or 5000
+        print(f"🚀 Spawning {args.spawn} on port {port} (synthetic camera)...")
+        process = spawn_app(args.spawn, port)
+
+    try:
+        test = LoadTest(args.url, APP_ENDPOINTS[app_name], args.viewers, args.pollers,
+                        args.duration, args.poll_interval)
+        results = test.run()
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(results, f, indent=2)
+    finally:
+        if process:
+            process.terminate()
+            process.wait(timeout=10)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Profiler Module - opt-in sampling profiler and per-frame trace spans.
+
+Both are off unless HELMET_PROFILING=1 is set, so production pays nothing
+for them by default.
+"""
+
+import os
+import sys
+import time
+import threading
+import collections
+from contextlib import contextmanager
+
+PROFILING_ENABLED = os.environ.get('HELMET_PROFILING') == '1'
+
+class SamplingProfiler:
+    """Samples every thread's Python stack and returns collapsed stacks.
+
+    Output is the "folded" format (thread;outer;...;inner count per line)
+    understood by flamegraph.pl, speedscope and inferno.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.lock = threading.Lock()   # one profile at a time
+
+    def profile(self, seconds, thread_filter=None):
+        """Sample for `seconds`; thread_filter is a list of thread-name prefixes"""
+        if not self.lock.acquire(blocking=False):
+            raise RuntimeError('A profile is already running')
+        try:
+            return self._sample(seconds, thread_filter)
+        finally:
+            self.lock.release()
+
+    def _sample(self, seconds, thread_filter):
+        counts = collections.Counter()
+        own_id = threading.get_ident()
+        end_time = time.perf_counter() + seconds
+        samples = 0
+
+        while time.perf_counter() < end_time:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                name = names.get(thread_id, f'thread-{thread_id}')
+                if thread_filter and not name.startswith(tuple(thread_filter)):
+                    continue
+                counts[self._fold(name, frame)] += 1
+            samples += 1
+            time.sleep(self.interval)
+
+        lines = [f"{stack} {count}" for stack, count in counts.most_common()]
+        return '\n'.join(lines) + '\n', samples
+
+    @staticmethod
+    def _fold(thread_name, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        stack.append(thread_name.replace(' ', '_'))
+        # Folded format separates frames with ';' and the count with a space
+        return ';'.join(part.replace(';', ':') for part in reversed(stack))
+
+class Tracer:
+    """Timing spans that follow one frame through the pipeline.
+
+    Spans are keyed by camera frame id: capture -> detect -> check_and_control
+    -> publish -> first HTTP response that served the result.
+    """
+
+    def __init__(self, enabled=PROFILING_ENABLED, max_traces=50):
+        self.enabled = enabled
+        self.traces = collections.OrderedDict()   # frame_id -> [span, ...]
+        self.max_traces = max_traces
+        self.lock = threading.Lock()
+
+    def add_span(self, frame_id, name, start, end, **attrs):
+        """Record a finished span (times from time.perf_counter())"""
+        if not self.enabled or frame_id is None:
+            return
+        span = {'name': name, 'start': start, 'ms': 1000 * (end - start),
+                'thread': threading.current_thread().name}
+        span.update(attrs)
+        with self.lock:
+            if frame_id not in self.traces:
+                self.traces[frame_id] = []
+                if len(self.traces) > self.max_traces:
+                    self.traces.popitem(last=False)
+            self.traces[frame_id].append(span)
+
+    @contextmanager
+    def span(self, frame_id, name, **attrs):
+        """with tracer.span(frame_id, 'detect'): ..."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(frame_id, name, start, time.perf_counter(), **attrs)
+
+    def mark_served(self, frame_id, name, published_at):
+        """Record the first HTTP response that delivered a frame's result"""
+        if not self.enabled or frame_id is None:
+            return
+        with self.lock:
+            spans = self.traces.get(frame_id)
+            if spans is None or any(s['name'] == name for s in spans):
+                return
+        self.add_span(frame_id, name, published_at, time.perf_counter())
+
+    def get_traces(self, count=10):
+        """Most recent traces, spans relative to the first span in each"""
+        with self.lock:
+            items = list(self.traces.items())[-count:] if count > 0 else []
+            items = [(frame_id, list(spans)) for frame_id, spans in items]
+
+        traces = []
+        for frame_id, spans in items:
+            origin = min(s['start'] for s in spans)
+            traces.append({
+                'frame_id': frame_id,
+                'total_ms': max(1000 * (s['start'] - origin) + s['ms'] for s in spans),
+                'spans': [self._relative(s, origin)
+                          for s in sorted(spans, key=lambda s: s['start'])],
+            })
+        return traces
+
+    @staticmethod
+    def _relative(span, origin):
+        relative = {key: value for key, value in span.items() if key != 'start'}
+        relative['offset_ms'] = 1000 * (span['start'] - origin)
+        return relative
+
+profiler = SamplingProfiler()
+tracer = Tracer()
+
+def register_debug_routes(app):
+    """Add /debug/profile and /debug/traces to a Flask app"""
+    from flask import Response, jsonify, request
+
+    @app.route('/debug/profile')
+    def debug_profile():
+        """Sampling profile of all threads, as collapsed stacks.
+
+        /debug/profile?seconds=10&threads=capture,detection
+        """
+        if not PROFILING_ENABLED:
+            return jsonify({'success': False,
+                            'error': 'Profiling disabled (set HELMET_PROFILING=1)'}), 404
+
+        seconds = request.args.get('seconds', 5.0, type=float)
+        if seconds is None or not 0 < seconds <= 60:
+            return jsonify({'success': False,
+                            'error': 'seconds must be a number in (0, 60]'}), 400
+        threads = request.args.get('threads')
+        try:
+            folded, samples = profiler.profile(seconds, threads.split(',') if threads else None)
+        except RuntimeError as e:
+            return jsonify({'success': False, 'error': str(e)}), 409
+
+        response = Response(folded, mimetype='text/plain')
+        response.headers['X-Profile-Samples'] = str(samples)
+        return response
+
+    @app.route('/debug/traces')
+    def debug_traces():
+        """Span timings for the most recent frames"""
+        if not PROFILING_ENABLED:
+            return jsonify({'success': False,
+                            'error': 'Profiling disabled (set HELMET_PROFILING=1)'}), 404
+        count = request.args.get('count', 10, type=int)
+        if count is None or count < 1:
+            return jsonify({'success': False,
+                            'error': 'count must be a positive integer'}), 400
+        return jsonify({'traces': tracer.get_traces(count)})
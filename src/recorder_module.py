@@ -0,0 +1,195 @@
+"""
+Incident Recorder Module - keeps the last few seconds of video in memory
+and saves a clip when ignition is blocked or the override is used.
+"""
+
+import os
+import cv2
+import time
+import queue
+import threading
+import collections
+import numpy as np
+from datetime import datetime
+
+class IncidentRecorder:
+    """Pre-event ring buffer + background clip encoder"""
+
+    def __init__(self, camera, pre_seconds=5, post_seconds=5, fps=10,
+                 jpeg_quality=70, output_dir='incident_clips',
+                 max_event_seconds=30, headroom_seconds=10, on_clip=None):
+        self.camera = camera
+        self.on_clip = on_clip      # on_clip(path), called from the encoder thread
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.max_event_seconds = max_event_seconds   # cap on how far merging extends a clip
+        self.fps = fps
+        self.jpeg_quality = jpeg_quality
+        self.output_dir = output_dir
+
+        # Ring of (timestamp, jpeg_bytes); sized to cover the longest merged
+        # clip plus headroom, so pre-event frames survive while the encoder
+        # is still busy writing the previous clip
+        ring_seconds = pre_seconds + max(max_event_seconds, post_seconds) + headroom_seconds
+        self.ring = collections.deque(maxlen=int(ring_seconds * fps))
+        self.ring_lock = threading.Lock()
+
+        # Events waiting for their post-event frames, handed to the encoder.
+        # Each event is a dict {'time', 'end', 'reasons'}; 'end' can still move
+        # while pending_event points at it
+        self.events = queue.Queue(maxsize=8)
+        self.event_lock = threading.Lock()
+        self.pending_event = None
+
+        self.is_running = False
+        self.buffer_thread = None
+        self.encoder_thread = None
+        self.clips_written = 0
+        self.events_dropped = 0
+        self.last_clip = None
+
+    def start(self):
+        """Start buffering frames and the background encoder"""
+        if self.is_running:
+            return
+        # A previous encoder may still be writing its last clip; it must be
+        # gone before is_running flips back, or it would carry on alongside
+        # the new one
+        for thread in (self.buffer_thread, self.encoder_thread):
+            if thread:
+                thread.join()
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.is_running = True
+
+        self.buffer_thread = threading.Thread(target=self._buffer_loop, name='recorder-buffer')
+        self.buffer_thread.daemon = True
+        self.buffer_thread.start()
+
+        self.encoder_thread = threading.Thread(target=self._encoder_loop, name='recorder-encoder')
+        self.encoder_thread.daemon = True
+        self.encoder_thread.start()
+        print(f"🎞️ Incident recorder started ({self.pre_seconds}s pre / {self.post_seconds}s post)")
+
+    def _buffer_loop(self):
+        """Sample camera frames into the ring as compressed JPEG bytes"""
+        interval = 1.0 / self.fps
+        while self.is_running:
+            frame = self.camera.get_frame()
+            if frame is not None:
+                ret, buffer = cv2.imencode('.jpg', frame,
+                                           [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+                if ret:
+                    with self.ring_lock:
+                        self.ring.append((time.time(), buffer.tobytes()))
+            time.sleep(interval)
+
+    def trigger(self, reason):
+        """Mark an incident now. Never blocks - safe to call from the detection loop."""
+        if not self.is_running:
+            return False
+
+        now = time.time()
+        with self.event_lock:
+            event = self.pending_event
+            # A FAIL every 0.5s would otherwise produce one clip per detection:
+            # merge into the pending clip and push its end out instead
+            if event and now <= event['end']:
+                event['end'] = min(now + self.post_seconds,
+                                   event['time'] + self.max_event_seconds)
+                if reason not in event['reasons']:
+                    event['reasons'].append(reason)
+                return True
+
+            event = {'time': now, 'end': now + self.post_seconds, 'reasons': [reason]}
+            try:
+                self.events.put_nowait(event)
+            except queue.Full:
+                self.events_dropped += 1
+                return False
+            self.pending_event = event
+            return True
+
+    def _encoder_loop(self):
+        """Wait for each event's post-window to fill, then write the clip"""
+        while self.is_running:
+            try:
+                event = self.events.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            # Let the post-event frames arrive; later triggers may extend 'end'
+            while self.is_running:
+                with self.event_lock:
+                    wait = event['end'] - time.time()
+                    if wait <= 0:
+                        if self.pending_event is event:
+                            self.pending_event = None
+                        break
+                time.sleep(min(wait, 0.5))
+            if not self.is_running:
+                break
+
+            with self.ring_lock:
+                frames = [jpeg for ts, jpeg in self.ring
+                          if event['time'] - self.pre_seconds <= ts <= event['end']]
+
+            if frames:
+                try:
+                    self._write_clip(frames, event['time'], '+'.join(event['reasons']))
+                except Exception as e:
+                    print(f"⚠️ Clip write error: {e}")
+
+    def _write_clip(self, frames, event_time, reason):
+        """Decode buffered JPEGs and write them as an .mp4 clip"""
+        stamp = datetime.fromtimestamp(event_time).strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(self.output_dir, f"{stamp}_{reason}.mp4")
+
+        writer = None
+        for jpeg in frames:
+            image = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if image is None:
+                continue
+            if writer is None:
+                height, width = image.shape[:2]
+                writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'),
+                                         self.fps, (width, height))
+            elif image.shape[:2] != (height, width):
+                image = cv2.resize(image, (width, height))
+            writer.write(image)
+
+        if writer is not None:
+            writer.release()
+            self.clips_written += 1
+            self.last_clip = path
+            print(f"🎞️ Incident clip saved: {path} ({len(frames)} frames)")
+            if self.on_clip:
+                self.on_clip(path)
+
+    def stop(self):
+        """Stop buffering; pending clips are abandoned"""
+        self.is_running = False
+        # Forget abandoned events, so triggers after a restart start new clips
+        # instead of merging into one that will never be written
+        with self.event_lock:
+            self.pending_event = None
+            while True:
+                try:
+                    self.events.get_nowait()
+                except queue.Empty:
+                    break
+        for thread in (self.buffer_thread, self.encoder_thread):
+            if thread:
+                thread.join(timeout=2)
+
+    def get_status(self):
+        with self.ring_lock:
+            buffered = len(self.ring)
+            buffer_bytes = sum(len(jpeg) for _, jpeg in self.ring)
+        return {
+            'running': self.is_running,
+            'buffered_frames': buffered,
+            'buffer_kb': buffer_bytes // 1024,
+            'clips_written': self.clips_written,
+            'events_dropped': self.events_dropped,
+            'last_clip': self.last_clip
+        }
@@ -0,0 +1,298 @@
+"""
+Model Registry Module - load, warm up and hot-swap detection models while
+the pipeline keeps running, and A/B a candidate model on sampled frames.
+
+Loading a .pt file unpickles it, which can run arbitrary code. Models are
+therefore only loaded by bare filename from one models directory, and the
+/api/models endpoints are off unless HELMET_MODEL_ADMIN=1 is set.
+"""
+
+import os
+import math
+import time
+import queue
+import random
+import threading
+import collections
+import numpy as np
+from ultralytics import YOLO
+from detection_module import find_person, to_model_input
+
+MODEL_ADMIN_ENABLED = os.environ.get('HELMET_MODEL_ADMIN') == '1'
+MODELS_DIR = os.environ.get('HELMET_MODELS_DIR',
+                            os.path.dirname(os.path.abspath(__file__)))
+
+class ModelRegistry:
+    """Named model versions for one AIDetector"""
+
+    def __init__(self, detector, models_dir=MODELS_DIR, recent_frames=8, on_swap=None):
+        self.detector = detector
+        self.models_dir = models_dir
+        self.on_swap = on_swap      # on_swap(name), called after a new model is active
+        self.lock = threading.Lock()
+
+        # name -> {'path', 'state', 'model', timings...}
+        self.models = {}
+        if detector.model_loaded:
+            self.models[detector.model_name] = {
+                'path': detector.model_name, 'state': 'active', 'model': detector.model}
+
+        # Recent live frames, used to warm up new models on real input
+        self.recent = collections.deque(maxlen=recent_frames)
+
+        # A/B: shadow-run a candidate on a sampled fraction of live frames
+        self.ab_name = None
+        self.ab_fraction = 0.0
+        self.ab_queue = queue.Queue(maxsize=2)
+        self.ab_stats = None
+        self.ab_thread = None
+        # Held while the candidate runs; activate() takes it first, so the
+        # candidate is never live in the detector and in _ab_loop at once
+        self.ab_lock = threading.Lock()
+
+    # ---------- loading / warm-up / swap ----------
+
+    def resolve(self, filename):
+        """Full path of a .pt file in models_dir, or raise ValueError.
+
+        Only bare filenames are accepted - no directories, '..' or URLs.
+        """
+        if (not isinstance(filename, str) or os.path.basename(filename) != filename
+                or filename in ('.', '..') or not filename.endswith('.pt')):
+            raise ValueError(f'{filename!r} is not a .pt filename in the models directory')
+        path = os.path.join(self.models_dir, filename)
+        if not os.path.isfile(path):
+            raise ValueError(f'{filename} not found in {self.models_dir}')
+        return path
+
+    def load_async(self, filename, name=None, activate=False):
+        """Load + warm a model in the background; optionally swap it in when ready"""
+        try:
+            path = self.resolve(filename)
+        except ValueError as e:
+            return False, str(e)
+        name = name or filename
+        with self.lock:
+            if name == self.ab_name:
+                return False, f'{name} is running an A/B test; stop it first'
+            entry = self.models.get(name)
+            if entry and entry['state'] in ('loading', 'warming'):
+                return False, f'{name} is already loading'
+            if entry and entry['state'] == 'active':
+                return False, f'{name} is the active model'
+            self.models[name] = {'path': path, 'state': 'loading', 'model': None}
+
+        thread = threading.Thread(target=self._load, args=(name, path, activate),
+                                  name=f'model-load-{name}')
+        thread.daemon = True
+        thread.start()
+        return True, f'Loading {name} in background'
+
+    def _load(self, name, path, activate):
+        entry = self.models[name]
+        try:
+            start = time.perf_counter()
+            model = YOLO(path)
+            entry['load_ms'] = 1000 * (time.perf_counter() - start)
+
+            entry['state'] = 'warming'
+            entry.update(self._warm_up(model))
+            entry['model'] = model
+            entry['state'] = 'ready'
+            print(f"✅ Model {name} ready (load {entry['load_ms']:.0f}ms, "
+                  f"warm-up first {entry['warmup_first_ms']:.0f}ms / "
+                  f"steady {entry['warmup_ms']:.0f}ms)")
+        except Exception as e:
+            entry['state'] = 'failed'
+            entry['error'] = str(e)
+            print(f"❌ Error loading model {name}: {e}")
+            return
+
+        if activate:
+            self.activate(name)
+
+    def _warm_up(self, model):
+        """Run the model on recent live frames (first call is the slow one)"""
+        frames = list(self.recent) or [np.zeros((480, 640, 3), dtype=np.uint8)] * 3
+        timings = []
+        for frame in frames:
+            start = time.perf_counter()
+            model(to_model_input(frame), verbose=False)
+            timings.append(1000 * (time.perf_counter() - start))
+        steady = timings[1:] or timings
+        return {
+            'warmup_frames': len(timings),
+            'warmup_first_ms': timings[0],
+            'warmup_ms': sum(steady) / len(steady),
+        }
+
+    def activate(self, name):
+        """Swap a ready model into the detector; the previous one stays loaded for rollback"""
+        with self.ab_lock, self.lock:
+            entry = self.models.get(name)
+            if entry is None or entry['model'] is None:
+                return False, f'{name} is not loaded'
+
+            swap_ms = self.detector.swap_model(entry['model'], name)
+            for other in self.models.values():
+                if other['state'] == 'active':
+                    other['state'] = 'ready'
+            entry['state'] = 'active'
+            entry['swap_ms'] = swap_ms
+            if self.ab_name == name:
+                self.ab_name = None      # candidate is live now; nothing to compare
+        print(f"🔁 Active model: {name} (swap {swap_ms:.1f}ms)")
+        if self.on_swap:
+            self.on_swap(name)
+        return True, f'{name} active (swap {swap_ms:.1f}ms)'
+
+    # ---------- live frames / A/B ----------
+
+    def observe(self, frame):
+        """Called by the detection loop after each detect(); never blocks"""
+        if frame is None:
+            return
+        self.recent.append(frame)
+
+        if self.ab_name and random.random() < self.ab_fraction:
+            primary = self.detector.last_inference
+            # Only compare with the model call made on this frame: skip it if
+            # that call fell back to simulation or another thread detected since
+            if (primary is None or primary['frame'] != id(frame)
+                    or primary['detection'] != self.detector.detection_count):
+                return
+            try:
+                self.ab_queue.put_nowait((frame, primary))
+            except queue.Full:
+                self.ab_stats['dropped'] += 1
+
+    def set_ab(self, name, fraction):
+        """Shadow-run `name` on `fraction` of live frames (fraction 0 stops the test)"""
+        with self.lock:
+            if fraction <= 0:
+                self.ab_name = None
+                return True, 'A/B test stopped'
+            entry = self.models.get(name)
+            if entry is None or entry['state'] != 'ready':
+                return False, f'{name} is not a ready (inactive) model'
+
+            self.ab_name = name
+            self.ab_fraction = min(fraction, 1.0)
+            self.ab_stats = {'candidate': name, 'samples': 0, 'agree': 0, 'dropped': 0,
+                             'primary_ms': collections.deque(maxlen=500),
+                             'candidate_ms': collections.deque(maxlen=500)}
+            if self.ab_thread is None or not self.ab_thread.is_alive():
+                self.ab_thread = threading.Thread(target=self._ab_loop, name='model-ab')
+                self.ab_thread.daemon = True
+                self.ab_thread.start()
+        return True, f'A/B: {name} on {self.ab_fraction:.0%} of frames'
+
+    def _ab_loop(self):
+        """Run the candidate off the detection path and compare with the live result"""
+        while True:
+            frame, primary = self.ab_queue.get()
+            with self.ab_lock:
+                with self.lock:
+                    name, stats = self.ab_name, self.ab_stats
+                    model = self.models[name]['model'] if name else None
+                if model is None:
+                    continue
+                try:
+                    start = time.perf_counter()
+                    results = model(to_model_input(frame), verbose=False)
+                    candidate_ms = 1000 * (time.perf_counter() - start)
+                except Exception as e:
+                    print(f"⚠️ A/B candidate error: {e}")
+                    continue
+
+            person_detected, _ = find_person(results)
+            with self.lock:
+                stats['samples'] += 1
+                stats['agree'] += person_detected == primary['person_detected']
+                stats['primary_ms'].append(primary['ms'])
+                stats['candidate_ms'].append(candidate_ms)
+
+    # ---------- status ----------
+
+    def get_status(self):
+        with self.lock:
+            models = {name: {key: value for key, value in entry.items() if key != 'model'}
+                      for name, entry in self.models.items()}
+            stats = self.ab_stats
+            ab = None
+            if stats:
+                ab = {
+                    'candidate': stats['candidate'],
+                    'running': self.ab_name == stats['candidate'],
+                    'fraction': self.ab_fraction,
+                    'samples': stats['samples'],
+                    'dropped': stats['dropped'],
+                    'agreement': stats['agree'] / stats['samples'] if stats['samples'] else None,
+                    'primary_ms': _latency_summary(stats['primary_ms']),
+                    'candidate_ms': _latency_summary(stats['candidate_ms']),
+                }
+        return {'active': self.detector.model_name, 'models': models, 'ab_test': ab}
+
+def _latency_summary(values):
+    values = sorted(values)
+    if not values:
+        return None
+    return {
+        'mean': sum(values) / len(values),
+        'p50': values[len(values) // 2],
+        'p90': values[min(len(values) - 1, int(len(values) * 0.9))],
+    }
+
+def register_model_routes(app, registry):
+    """Add the /api/models endpoints to a Flask app (404 unless HELMET_MODEL_ADMIN=1)"""
+    from flask import jsonify, request
+
+    def disabled():
+        return jsonify({'success': False,
+                        'error': 'Model admin disabled (set HELMET_MODEL_ADMIN=1)'}), 404
+
+    @app.route('/api/models')
+    def list_models():
+        """Loaded model versions, warm-up/swap timings and A/B results"""
+        if not MODEL_ADMIN_ENABLED:
+            return disabled()
+        return jsonify(registry.get_status())
+
+    @app.route('/api/models/load', methods=['POST'])
+    def load_model():
+        """{"path": "yolov8s.pt", "name": optional, "activate": false}
+
+        path is a filename inside the models directory (HELMET_MODELS_DIR)
+        """
+        if not MODEL_ADMIN_ENABLED:
+            return disabled()
+        data = request.get_json(silent=True) or {}
+        if not data.get('path'):
+            return jsonify({'success': False, 'error': 'path is required'})
+        ok, message = registry.load_async(data['path'], data.get('name'),
+                                          bool(data.get('activate')))
+        return jsonify({'success': ok, 'message': message})
+
+    @app.route('/api/models/activate', methods=['POST'])
+    def activate_model():
+        """{"name": "yolov8s.pt"}"""
+        if not MODEL_ADMIN_ENABLED:
+            return disabled()
+        data = request.get_json(silent=True) or {}
+        ok, message = registry.activate(data.get('name'))
+        return jsonify({'success': ok, 'message': message})
+
+    @app.route('/api/models/ab', methods=['POST'])
+    def ab_test():
+        """{"name": "yolov8s.pt", "fraction": 0.1} - fraction 0 stops the test"""
+        if not MODEL_ADMIN_ENABLED:
+            return disabled()
+        data = request.get_json(silent=True) or {}
+        try:
+            fraction = float(data.get('fraction', 0))
+        except (TypeError, ValueError):
+            fraction = math.nan
+        if math.isnan(fraction):
+            return jsonify({'success': False, 'error': 'fraction must be a number'})
+        ok, message = registry.set_ab(data.get('name'), fraction)
+        return jsonify({'success': ok, 'message': message})
@@ -0,0 +1,239 @@
+"""
+Offline Scoring - re-score recorded footage with the current AIDetector and
+VehicleControl logic, for audits.
+
+Videos are split into chunks that worker processes decode and score in
+batches. Each finished chunk is written as its own part file (Parquet if
+pyarrow is installed, CSV otherwise) and recorded in a manifest, so an
+interrupted run picks up where it stopped:
+
+    python score_footage.py footage/*.mp4 --out audit_scores --workers 8
+"""
+
+import os
+import sys
+import glob
+import time
+import hashlib
+import argparse
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+import pandas as pd
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mkv', '.mov', '.m4v')
+MANIFEST = '_done.txt'
+COLUMNS = ['file', 'frame', 'video_time_s', 'is_safe', 'confidence',
+           'ignition_allowed', 'message']
+
+# Set in the parent before the pool forks, so workers share the model
+# copy-on-write instead of each loading it (see inference_module.py)
+_detector = None
+_controller = None
+
+try:
+    import pyarrow  # noqa: F401
+    PART_FORMAT = 'parquet'
+except ImportError:
+    PART_FORMAT = 'csv'
+
+def find_videos(paths):
+    """Expand files, directories and glob patterns into a sorted video list"""
+    videos = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                videos.extend(os.path.join(root, f) for f in files
+                              if f.lower().endswith(VIDEO_EXTENSIONS))
+        else:
+            videos.extend(glob.glob(path) or [path])
+    return sorted(set(videos))
+
+def plan_chunks(videos, chunk_frames):
+    """Split every video into (file, start, end, fps) chunks"""
+    chunks = []
+    for path in videos:
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            print(f"⚠️ Cannot open {path}, skipped")
+            continue
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        cap.release()
+        if total <= 0:
+            # Container doesn't report a length - score it as one chunk to EOF
+            chunks.append((path, 0, sys.maxsize, fps))
+            continue
+        for start in range(0, total, chunk_frames):
+            chunks.append((path, start, min(start + chunk_frames, total), fps))
+    return chunks
+
+def chunk_key(chunk):
+    path, start, end, _ = chunk
+    return f"{os.path.abspath(path)}|{start}|{end}"
+
+def part_name(chunk):
+    path, start, _, _ = chunk
+    stem = os.path.splitext(os.path.basename(path))[0]
+    # Same-named videos from different directories must not share part files
+    digest = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:8]
+    return f"{stem}_{digest}_{start:09d}.{PART_FORMAT}"
+
+def _worker_init():
+    # One torch thread per process; the pool provides the parallelism
+    try:
+        import torch
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+
+def score_chunk(chunk, sample_fps, batch_size):
+    """Worker: decode one chunk and score the sampled frames in batches"""
+    path, start, end, fps = chunk
+    stride = max(1, int(round(fps / sample_fps))) if sample_fps else 1
+    rows = []
+    decode_time = infer_time = 0.0
+
+    cap = cv2.VideoCapture(path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    batch, indexes = [], []
+
+    def flush():
+        nonlocal infer_time
+        t0 = time.perf_counter()
+        verdicts = _detector.detect_batch(batch)
+        infer_time += time.perf_counter() - t0
+        for index, (is_safe, confidence, _) in zip(indexes, verdicts):
+            allowed, message = _controller.decide(is_safe, confidence)
+            rows.append([path, index, round(index / fps, 3), bool(is_safe),
+                         float(confidence), allowed, message])
+        batch.clear()
+        indexes.clear()
+
+    for index in range(start, end):
+        t0 = time.perf_counter()
+        # grab() every frame to advance, retrieve() only the sampled ones
+        if not cap.grab():
+            break
+        if (index - start) % stride == 0:
+            ret, frame = cap.retrieve()
+            if ret:
+                batch.append(frame)
+                indexes.append(index)
+        decode_time += time.perf_counter() - t0
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    cap.release()
+
+    return chunk, rows, decode_time, infer_time
+
+def write_part(out_dir, chunk, rows):
+    """Write one chunk's verdicts atomically, then record it in the manifest"""
+    frame = pd.DataFrame(rows, columns=COLUMNS)
+    path = os.path.join(out_dir, part_name(chunk))
+    tmp_path = path + '.tmp'
+    if PART_FORMAT == 'parquet':
+        frame.to_parquet(tmp_path, index=False)
+    else:
+        frame.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+    with open(os.path.join(out_dir, MANIFEST), 'a') as f:
+        f.write(chunk_key(chunk) + '\n')
+
+def load_manifest(out_dir):
+    path = os.path.join(out_dir, MANIFEST)
+    if not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return {line.strip() for line in f if line.strip()}
+
+def main():
+    global _detector, _controller
+
+    parser = argparse.ArgumentParser(description="Re-score recorded footage offline")
+    parser.add_argument('inputs', nargs='+', help='video files, directories or globs')
+    parser.add_argument('--out', default='scores', help='output directory')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--sample-fps', type=float, default=2.0,
+                        help='frames per second of video to score (0 = every frame; '
+                             'live detection runs at 2)')
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--chunk-frames', type=int, default=1800,
+                        help='frames per work unit / part file')
+    args = parser.parse_args()
+
+    videos = find_videos(args.inputs)
+    if not videos:
+        print("❌ No video files found")
+        sys.exit(1)
+
+    os.makedirs(args.out, exist_ok=True)
+    chunks = plan_chunks(videos, args.chunk_frames)
+    done = load_manifest(args.out)
+    todo = [c for c in chunks if chunk_key(c) not in done]
+    print(f"🎬 {len(videos)} videos, {len(chunks)} chunks, "
+          f"{len(chunks) - len(todo)} already done → scoring {len(todo)}")
+    if PART_FORMAT == 'csv':
+        print("   (pyarrow not installed - writing CSV parts instead of Parquet)")
+    if not todo:
+        return
+
+    # Load the model once, before forking
+    from detection_module import AIDetector
+    from control_module import VehicleControl
+    _detector = AIDetector()
+    if not _detector.model_loaded:
+        print("❌ Model failed to load - refusing to write simulated verdicts")
+        sys.exit(1)
+    # A model error must fail its chunk (kept out of the manifest, retried on
+    # the next run), never turn into made-up PASS/FAIL rows
+    _detector.fallback_to_simulation = False
+    _controller = VehicleControl(log_file=None)   # audits don't touch the live log
+
+    frames = failed = 0
+    decode_time = infer_time = 0.0
+    start = time.time()
+    ctx = mp.get_context('fork')
+
+    pool = ProcessPoolExecutor(args.workers, mp_context=ctx, initializer=_worker_init)
+    futures = {pool.submit(score_chunk, c, args.sample_fps, args.batch_size): c for c in todo}
+    try:
+        for i, future in enumerate(as_completed(futures), 1):
+            try:
+                chunk, rows, chunk_decode, chunk_infer = future.result()
+            except Exception as e:
+                # Left out of the manifest, so the next run retries it
+                failed += 1
+                print(f"   [{i}/{len(todo)}] ❌ {part_name(futures[future])} failed: {e}")
+                continue
+            write_part(args.out, chunk, rows)
+            frames += len(rows)
+            decode_time += chunk_decode
+            infer_time += chunk_infer
+            elapsed = time.time() - start
+            print(f"   [{i}/{len(todo)}] {part_name(chunk)}: {len(rows)} frames "
+                  f"({frames / elapsed:.1f} fps overall)")
+    except KeyboardInterrupt:
+        print("\n⏸️ Interrupted - finished chunks are saved, rerun to resume")
+        for future in futures:
+            future.cancel()
+    finally:
+        pool.shutdown(wait=False)
+
+    elapsed = time.time() - start
+    print("\n📊 THROUGHPUT")
+    print(f"   frames scored: {frames} in {elapsed:.1f}s")
+    if failed:
+        print(f"   ⚠️ {failed} chunks failed - rerun to retry them")
+    print(f"   {frames / elapsed:.1f} frames/sec total, "
+          f"{frames / elapsed / args.workers:.2f} frames/sec per core ({args.workers} workers)")
+    if frames:
+        print(f"   per frame: decode {1000 * decode_time / frames:.1f}ms, "
+              f"inference {1000 * infer_time / frames:.1f}ms (CPU time per worker)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+System State Module - shared pipeline state for Flask, detection and capture threads.
+
+Readers never take a lock: every write builds a NEW immutable snapshot and
+swaps one reference, which is atomic in Python. Writers (detection loop,
+start/stop) serialize on a lock, but there are only a handful of them.
+"""
+
+import time
+import threading
+from types import MappingProxyType
+from collections import namedtuple
+
+# One immutable view of the system; 'current' is a read-only dict and
+# updated_at is time.perf_counter() (comparable with trace span times)
+Snapshot = namedtuple('Snapshot', ['version', 'active', 'current', 'updated_at'])
+
+class SystemState:
+    """Copy-on-write status snapshots + single-instance worker lifecycle"""
+
+    def __init__(self, initial_status):
+        self._write_lock = threading.Lock()
+        self._changed = threading.Condition(self._write_lock)   # long-poll waiters
+        self._lifecycle_lock = threading.Lock()
+        self._snapshot = Snapshot(0, False, MappingProxyType(dict(initial_status)),
+                                  time.perf_counter())
+        self.detection_thread = None
+
+    def snapshot(self):
+        """Current snapshot - lock-free, safe to read from any thread"""
+        return self._snapshot
+
+    @property
+    def active(self):
+        return self._snapshot.active
+
+    def _publish(self, active=None, current=None):
+        """Swap in a new snapshot with the given fields replaced"""
+        with self._write_lock:
+            old = self._snapshot
+            if current is not None:
+                current = MappingProxyType(dict(old.current, **current))
+            self._snapshot = Snapshot(
+                old.version + 1,
+                old.active if active is None else active,
+                old.current if current is None else current,
+                time.perf_counter())
+            self._changed.notify_all()
+            return self._snapshot
+
+    def update_current(self, **changes):
+        """Publish a new 'current' status (merged over the previous one)"""
+        return self._publish(current=changes)
+
+    def touch(self):
+        """New version with the same content - for changes outside the snapshot
+        (e.g. override toggled) that status readers should still see"""
+        return self._publish()
+
+    def wait_for_change(self, version, timeout):
+        """Block until the version differs from `version` (long-poll only -
+        normal reads never wait). Returns the newest snapshot either way."""
+        with self._changed:
+            self._changed.wait_for(lambda: self._snapshot.version != version, timeout=timeout)
+            return self._snapshot
+
+    def start(self, camera, loop=None):
+        """Start camera and (optionally) one detection thread running loop().
+
+        Returns (started, message). Calling it while already running is a no-op,
+        so a double click on START can't spawn a second detection thread.
+        """
+        with self._lifecycle_lock:
+            if self.active:
+                return False, 'System already running'
+            if self.detection_thread and self.detection_thread.is_alive():
+                return False, 'Previous detection thread still stopping'
+
+            if not camera.start():
+                return False, 'Failed to start camera'
+
+            self._publish(active=True)
+
+            if loop is not None:
+                self.detection_thread = threading.Thread(target=loop, name='detection')
+                self.detection_thread.daemon = True
+                self.detection_thread.start()
+            return True, 'System started'
+
+    def stop(self, camera, timeout=3):
+        """Stop the detection thread, then the camera"""
+        with self._lifecycle_lock:
+            if not self.active:
+                return False, 'System not running'
+
+            self._publish(active=False)
+            if self.detection_thread:
+                self.detection_thread.join(timeout=timeout)
+            camera.stop()
+            return True, 'System stopped'
@@ -0,0 +1,179 @@
+"""
+Status Module - versioned, cached /api/status bodies with ETags, and a
+compact MessagePack encoding for fleet collectors.
+
+The status body is built and encoded at most once per state version; every
+poll in between reuses the same bytes (or gets a 304 if the client already
+has them). So every writer of data that ends up in the body has to publish a
+new version (SystemState.touch) when it changes it.
+"""
+
+import os
+import json
+import struct
+import threading
+
+# Distinguishes ETags across restarts (versions start at 0 again)
+BOOT_ID = os.urandom(4).hex()
+
+FORMATS = {
+    'json': 'application/json',
+    'msgpack': 'application/x-msgpack',
+}
+
+class StatusCache:
+    """Caches the encoded status body for the current state version"""
+
+    def __init__(self, build):
+        self.build = build          # build(snapshot) -> status dict
+        self._entry = None          # (version, status dict, {format: bytes})
+        self._lock = threading.Lock()
+
+    def get(self, snapshot, fmt='json'):
+        """(body bytes, etag) for this snapshot, building it only on a new version"""
+        entry = self._entry
+        if entry is None or entry[0] != snapshot.version:
+            with self._lock:
+                entry = self._entry
+                if entry is None or entry[0] != snapshot.version:
+                    entry = (snapshot.version, self.build(snapshot), {})
+                    self._entry = entry
+
+        version, status, bodies = entry
+        body = bodies.get(fmt)
+        if body is None:
+            body = bodies[fmt] = encode(status, fmt)
+        return body, etag_for(version, fmt)
+
+def register_status_route(app, state, cache, on_served=None):
+    """Add GET /api/status to a Flask app, served from cache for state's snapshots.
+
+    on_served(snapshot) is called for every full (non-304) response.
+    """
+    from flask import Response, request
+
+    @app.route('/api/status')
+    def get_status():
+        """Get current system status.
+
+        - Send If-None-Match with the last ETag to get 304 when nothing changed
+        - ?wait=N (seconds, max 30) with If-None-Match long-polls for the next version
+        - ?format=msgpack or Accept: application/x-msgpack returns MessagePack
+        """
+        fmt = 'json'
+        if (request.args.get('format') == 'msgpack' or
+                request.accept_mimetypes.best == FORMATS['msgpack']):
+            fmt = 'msgpack'
+
+        if_none_match = request.headers.get('If-None-Match')
+        snapshot = state.snapshot()
+        wait = min(request.args.get('wait', 0, type=float), 30)
+        if wait > 0 and version_from_etag(if_none_match) == snapshot.version:
+            snapshot = state.wait_for_change(snapshot.version, wait)
+
+        body, etag = cache.get(snapshot, fmt)
+        if if_none_match == etag:
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype=FORMATS[fmt])
+            if on_served:
+                on_served(snapshot)
+
+        response.headers['ETag'] = etag
+        # Browsers must revalidate every poll, which turns unchanged polls into 304s
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+def etag_for(version, fmt):
+    return f'"{BOOT_ID}-{version}-{fmt}"'
+
+def version_from_etag(etag):
+    """Version number inside one of our ETags, or None if it isn't ours"""
+    try:
+        boot, version, _ = etag.strip().strip('"').split('-')
+        return int(version) if boot == BOOT_ID else None
+    except (AttributeError, ValueError):
+        return None
+
+def encode(status, fmt):
+    if fmt == 'msgpack':
+        return packb(status)
+    return json.dumps(status).encode()
+
+def packb(obj):
+    """Minimal MessagePack encoder (nil, bool, int, float, str, bytes, array, map).
+
+    Output is standard MessagePack, so collectors can decode it with any
+    msgpack library.
+    """
+    out = bytearray()
+    _pack(obj, out)
+    return bytes(out)
+
+def _pack(obj, out):
+    if obj is None:
+        out.append(0xc0)
+    elif obj is True:
+        out.append(0xc3)
+    elif obj is False:
+        out.append(0xc2)
+    elif isinstance(obj, int):
+        _pack_int(obj, out)
+    elif isinstance(obj, float):
+        out.append(0xcb)
+        out += struct.pack('>d', obj)
+    elif isinstance(obj, str):
+        data = obj.encode('utf-8')
+        _pack_header(len(data), out, fix=(0xa0, 32), headers=(0xd9, 0xda, 0xdb))
+        out += data
+    elif isinstance(obj, (bytes, bytearray)):
+        _pack_header(len(obj), out, fix=None, headers=(0xc4, 0xc5, 0xc6))
+        out += obj
+    elif isinstance(obj, (list, tuple)):
+        _pack_header(len(obj), out, fix=(0x90, 16), headers=(None, 0xdc, 0xdd))
+        for item in obj:
+            _pack(item, out)
+    elif isinstance(obj, dict) or hasattr(obj, 'items'):
+        _pack_header(len(obj), out, fix=(0x80, 16), headers=(None, 0xde, 0xdf))
+        for key, value in obj.items():
+            _pack(key, out)
+            _pack(value, out)
+    elif hasattr(obj, 'item'):
+        # numpy scalars (e.g. numpy.bool_ / float32 from detection results)
+        _pack(obj.item(), out)
+    else:
+        _pack(str(obj), out)
+
+def _pack_int(value, out):
+    if 0 <= value < 128:
+        out.append(value)
+    elif -32 <= value < 0:
+        out.append(value & 0xff)
+    elif value >= 0:
+        for marker, fmt, limit in ((0xcc, '>B', 1 << 8), (0xcd, '>H', 1 << 16),
+                                   (0xce, '>I', 1 << 32), (0xcf, '>Q', 1 << 64)):
+            if value < limit:
+                out.append(marker)
+                out += struct.pack(fmt, value)
+                return
+        raise OverflowError('int too large for MessagePack')
+    else:
+        for marker, fmt, limit in ((0xd0, '>b', 1 << 7), (0xd1, '>h', 1 << 15),
+                                   (0xd2, '>i', 1 << 31), (0xd3, '>q', 1 << 63)):
+            if value >= -limit:
+                out.append(marker)
+                out += struct.pack(fmt, value)
+                return
+        raise OverflowError('int too small for MessagePack')
+
+def _pack_header(length, out, fix, headers):
+    """Length prefix: fix-size type if it fits, else 8/16/32-bit length"""
+    if fix and length < fix[1]:
+        out.append(fix[0] | length)
+        return
+    for marker, fmt, limit in zip(headers, ('>B', '>H', '>I'), (1 << 8, 1 << 16, 1 << 32)):
+        if marker is not None and length < limit:
+            out.append(marker)
+            out += struct.pack(fmt, length)
+            return
+    raise OverflowError('object too large for MessagePack')
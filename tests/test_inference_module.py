@@ -0,0 +1,69 @@
+import os
+import time
+import threading
+
+import pytest
+
+from inference_module import InferencePool, InferenceError
+
+class FakeDetector:
+    """Echoes the frame back as its verdict; 'bad' raises, 'die' kills the worker"""
+
+    def __init__(self, delay=0.02):
+        self.lock = threading.Lock()
+        self.fallback_to_simulation = True
+        self.delay = delay
+
+    def detect(self, frame):
+        time.sleep(self.delay)
+        if frame == 'bad':
+            raise ValueError('model error')
+        if frame == 'die':
+            os._exit(1)
+        if frame == 'fallback?':
+            return self.fallback_to_simulation, 1.0, 'ts'
+        return frame, 1.0, 'ts'
+
+@pytest.fixture
+def pool():
+    pool = InferencePool(FakeDetector(), workers=2)
+    pool.start()
+    yield pool
+    pool.stop()
+
+def frames_of(results):
+    return [frame for frame, _, _ in results]
+
+def test_map_keeps_input_order(pool):
+    frames = [f'f{i}' for i in range(20)]
+    assert frames_of(pool.map(frames)) == frames
+
+def test_failed_frame_does_not_leak_into_next_map(pool):
+    with pytest.raises(InferenceError, match='model error'):
+        list(pool.map(['a', 'bad', 'c', 'd', 'e']))
+    assert frames_of(pool.map(['X', 'Y', 'Z'])) == ['X', 'Y', 'Z']
+
+def test_early_break_does_not_leak_into_next_map(pool):
+    for result in pool.map(['a', 'b', 'c', 'd', 'e']):
+        break
+    time.sleep(0.2)   # let the abandoned frames finish
+    assert frames_of(pool.map(['X', 'Y'])) == ['X', 'Y']
+
+def test_workers_never_fall_back_to_simulation(pool):
+    assert frames_of(pool.map(['fallback?'])) == [False]
+    # Only the forked copies change; the parent keeps its live behaviour
+    assert pool.detector.fallback_to_simulation is True
+
+def test_dead_worker_fails_frames_instead_of_hanging(pool):
+    with pytest.raises(InferenceError):
+        list(pool.map(['a', 'die', 'c', 'd']))
+    # The surviving worker still serves new work
+    assert frames_of(pool.map(['X', 'Y', 'Z'])) == ['X', 'Y', 'Z']
+
+def test_stop_resets_sequence_state(pool):
+    list(pool.map(['a', 'b']))
+    pool.stop()
+    assert pool.completed == {}
+    assert pool.next_seq == pool.next_result_seq == 0
+    pool.start()
+    assert frames_of(pool.map(['X'])) == ['X']
@@ -0,0 +1,180 @@
+import time
+import threading
+
+import pytest
+
+from state_module import SystemState
+from status_module import StatusCache, etag_for, version_from_etag, packb
+
+# ---------- MessagePack encoding ----------
+
+@pytest.mark.parametrize('value, expected', [
+    (0, b'\x00'),
+    (127, b'\x7f'),                       # largest positive fixint
+    (128, b'\xcc\x80'),
+    (255, b'\xcc\xff'),
+    (256, b'\xcd\x01\x00'),
+    (65535, b'\xcd\xff\xff'),
+    (65536, b'\xce\x00\x01\x00\x00'),
+    (2 ** 32, b'\xcf\x00\x00\x00\x01\x00\x00\x00\x00'),
+    (-1, b'\xff'),
+    (-32, b'\xe0'),                       # smallest negative fixint
+    (-33, b'\xd0\xdf'),
+    (-128, b'\xd0\x80'),
+    (-129, b'\xd1\xff\x7f'),
+    (-2 ** 31, b'\xd2\x80\x00\x00\x00'),
+    (-2 ** 31 - 1, b'\xd3\xff\xff\xff\xff\x7f\xff\xff\xff'),
+])
+def test_pack_int(value, expected):
+    assert packb(value) == expected
+
+def test_pack_int_out_of_range():
+    with pytest.raises(OverflowError):
+        packb(2 ** 64)
+    with pytest.raises(OverflowError):
+        packb(-2 ** 63 - 1)
+
+@pytest.mark.parametrize('length, header', [
+    (0, b'\xa0'),
+    (31, b'\xbf'),                        # largest fixstr
+    (32, b'\xd9\x20'),
+    (255, b'\xd9\xff'),
+    (256, b'\xda\x01\x00'),
+    (65536, b'\xdb\x00\x01\x00\x00'),
+])
+def test_pack_str(length, header):
+    text = 'x' * length
+    assert packb(text) == header + text.encode()
+
+def test_pack_str_is_utf8_byte_length():
+    assert packb('é') == b'\xa2\xc3\xa9'
+
+@pytest.mark.parametrize('length, header', [
+    (15, b'\x9f'),                        # largest fixarray
+    (16, b'\xdc\x00\x10'),
+    (65536, b'\xdd\x00\x01\x00\x00'),
+])
+def test_pack_array(length, header):
+    assert packb([None] * length) == header + b'\xc0' * length
+
+@pytest.mark.parametrize('length, header', [
+    (15, b'\x8f'),                        # largest fixmap
+    (16, b'\xde\x00\x10'),
+])
+def test_pack_map(length, header):
+    data = {i: True for i in range(length)}
+    assert packb(data) == header + b''.join(bytes([i]) + b'\xc3' for i in range(length))
+
+def test_pack_scalars():
+    assert packb(None) == b'\xc0'
+    assert packb(True) == b'\xc3'
+    assert packb(False) == b'\xc2'
+    assert packb(1.5) == b'\xcb\x3f\xf8\x00\x00\x00\x00\x00\x00'
+    assert packb(b'ab') == b'\xc4\x02ab'
+
+def test_pack_decodes_with_msgpack():
+    msgpack = pytest.importorskip('msgpack')
+    status = {'version': 300, 'current': {'confidence': 0.8, 'message': 'ok' * 40},
+              'logs': list(range(-40, 40)), 'none': None}
+    assert msgpack.unpackb(packb(status), strict_map_key=False) == status
+
+# ---------- StatusCache / ETags ----------
+
+def make_state():
+    return SystemState({'frame_id': None, 'message': 'ready'})
+
+def test_status_cache_builds_once_per_version():
+    state = make_state()
+    builds = []
+    cache = StatusCache(lambda snapshot: builds.append(snapshot.version) or
+                        {'version': snapshot.version})
+
+    body, etag = cache.get(state.snapshot())
+    assert cache.get(state.snapshot()) == (body, etag)
+    assert builds == [0]
+
+    state.touch()
+    new_body, new_etag = cache.get(state.snapshot())
+    assert builds == [0, 1]
+    assert new_etag != etag and new_body != body
+
+def test_status_cache_etag_per_format():
+    cache = StatusCache(lambda snapshot: {'version': snapshot.version})
+    snapshot = make_state().snapshot()
+    json_body, json_etag = cache.get(snapshot, 'json')
+    msgpack_body, msgpack_etag = cache.get(snapshot, 'msgpack')
+    assert json_body == b'{"version": 0}'
+    assert msgpack_body == packb({'version': 0})
+    assert json_etag != msgpack_etag
+
+def test_version_from_etag():
+    assert version_from_etag(etag_for(42, 'json')) == 42
+    assert version_from_etag('"deadbeef-42-json"') is None      # other boot
+    assert version_from_etag('"garbage"') is None
+    assert version_from_etag(None) is None
+
+# ---------- long-poll ----------
+
+def test_wait_for_change_times_out_with_same_snapshot():
+    state = make_state()
+    start = time.perf_counter()
+    snapshot = state.wait_for_change(0, timeout=0.2)
+    assert time.perf_counter() - start >= 0.2
+    assert snapshot.version == 0
+
+def test_wait_for_change_wakes_on_publish():
+    state = make_state()
+    threading.Timer(0.05, state.update_current, kwargs={'message': 'new'}).start()
+    start = time.perf_counter()
+    snapshot = state.wait_for_change(0, timeout=5)
+    assert time.perf_counter() - start < 2
+    assert snapshot.version == 1 and snapshot.current['message'] == 'new'
+
+# ---------- /api/status route ----------
+
+@pytest.fixture
+def app():
+    flask = pytest.importorskip('flask')
+    from status_module import register_status_route
+
+    app = flask.Flask(__name__)
+    app.state = make_state()
+    register_status_route(app, app.state,
+                          StatusCache(lambda snapshot: {'version': snapshot.version}))
+    return app
+
+def test_status_304_when_unchanged(app):
+    client = app.test_client()
+    first = client.get('/api/status')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+
+    again = client.get('/api/status', headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.data == b''
+
+    app.state.touch()
+    changed = client.get('/api/status', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+def test_status_msgpack(app):
+    response = app.test_client().get('/api/status?format=msgpack')
+    assert response.mimetype == 'application/x-msgpack'
+    assert response.data == packb({'version': 0})
+
+def test_status_long_poll_times_out_with_304(app):
+    client = app.test_client()
+    etag = client.get('/api/status').headers['ETag']
+    start = time.perf_counter()
+    response = client.get('/api/status?wait=0.3', headers={'If-None-Match': etag})
+    assert time.perf_counter() - start >= 0.3
+    assert response.status_code == 304
+
+def test_status_long_poll_returns_next_version(app):
+    client = app.test_client()
+    etag = client.get('/api/status').headers['ETag']
+    threading.Timer(0.05, app.state.touch).start()
+    response = client.get('/api/status?wait=5', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.json == {'version': 1}